@@ -0,0 +1,60 @@
+"""
+Shared, on-disk cache of the parsed OpenAPI spec for the devtools scripts.
+
+validate_openapi.py, gen_openapi_json.py and gen_postman_collection.py all
+read api/openapi.yaml, and CI runs them back-to-back. The first caller
+parses the YAML and pickles the result next to the spec (e.g.
+api/.openapi.cache.pkl); later callers load the pickle as long as the
+spec's mtime and size are unchanged.
+"""
+
+import os
+import pickle
+import tempfile
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader  # libyaml bindings
+except ImportError:
+    from yaml import SafeLoader
+
+
+def cache_path_for(path):
+    """Return the pickle path used to cache the spec at ``path``"""
+    head, tail = os.path.split(os.fspath(path))
+    stem = os.path.splitext(tail)[0]
+    return os.path.join(head, f".{stem}.cache.pkl")
+
+
+def load_spec(path):
+    """Load a YAML spec, reusing the pickled parse when the file is unchanged"""
+    st = os.stat(path)
+    key = (st.st_mtime_ns, st.st_size)
+    cache_path = cache_path_for(path)
+
+    try:
+        with open(cache_path, 'rb') as fh:
+            cached = pickle.load(fh)
+        if cached.get('key') == key:
+            return cached['data']
+    except Exception:
+        # missing, stale-format or corrupt cache: fall through and re-parse
+        pass
+
+    with open(path, 'rb') as fh:
+        data = yaml.load(fh, Loader=SafeLoader)
+
+    # write atomically so a concurrent reader never sees a partial pickle
+    tmp = None
+    try:
+        fd, tmp = tempfile.mkstemp(prefix='.openapi-', suffix='.tmp', dir=os.path.dirname(cache_path) or '.')
+        with os.fdopen(fd, 'wb') as fh:
+            pickle.dump({'key': key, 'data': data}, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_path)
+    except OSError:
+        # read-only checkout etc.: caching is best-effort
+        if tmp is not None and os.path.exists(tmp):
+            os.unlink(tmp)
+
+    return data
@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-import sys, json, os
+import sys, json, os, tempfile, argparse
 
 try:
     import yaml  # PyYAML
@@ -7,14 +7,213 @@ except Exception:
     sys.stderr.write("PyYAML is not installed. Please install it (e.g., pip install pyyaml) and rerun.\n")
     sys.exit(1)
 
+try:
+    from yaml import CSafeLoader as SafeLoader  # libyaml bindings
+except ImportError:
+    from yaml import SafeLoader
+
+from _spec_cache import load_spec
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 yaml_path = os.path.join(ROOT, 'api', 'openapi.yaml')
 json_path = os.path.join(ROOT, 'api', 'openapi.json')
 
-with open(yaml_path, 'r', encoding='utf-8') as f:
-    data = yaml.safe_load(f)
+_STR_TAG = 'tag:yaml.org,2002:str'
+_MERGE_TAG = 'tag:yaml.org,2002:merge'
+_MAP_TAGS = (None, '!', 'tag:yaml.org,2002:map')
+_SEQ_TAGS = (None, '!', 'tag:yaml.org,2002:seq')
+
+
+class NeedsTree(Exception):
+    """The YAML uses a feature the event streamer does not translate (anchors, merge keys, ...)"""
+
+
+_JSON_KEY_TYPES = (str, int, bool, type(None))
+
+
+def _orjson_matches_json(obj):
+    """True when orjson would encode obj exactly like json.dumps(default=str).
+
+    orjson spells some floats differently (1e16 vs 1e+16), writes null for
+    NaN/Infinity and formats non-string keys its own way; documents holding
+    any of those go through stdlib json instead. Strings, ints, bools, None
+    and default=str values (datetimes are passed through to it) agree.
+    """
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        t = type(o)
+        if t is dict:
+            for k in o:
+                if type(k) not in _JSON_KEY_TYPES:
+                    return False
+            stack.extend(o.values())
+        elif t is list:
+            stack.extend(o)
+        elif t is float:
+            if orjson.dumps(o) != repr(o).encode():
+                return False
+    return True
+
+
+def dumps(obj, indent=False):
+    """Serialize obj to UTF-8 JSON bytes exactly as json.dumps(default=str) would.
+
+    indent=True matches json.dump(indent=2). orjson is used when installed and
+    it provably yields the same bytes, so output never depends on whether it is.
+    """
+    if orjson is not None and _orjson_matches_json(obj):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            return orjson.dumps(obj, default=str, option=option)
+        except orjson.JSONEncodeError:
+            # e.g. integers outside orjson's 64-bit range
+            pass
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False, default=str).encode('utf-8')
+
+
+def stream_yaml_to_json(src, dst):
+    """Translate the YAML event stream from src straight into indented JSON on dst.
+
+    Writes the same bytes as dumps(yaml.safe_load(src), indent=True) without
+    building the document tree. Raises NeedsTree for YAML whose JSON form
+    depends on more than the current event (anchors/aliases, merge keys,
+    duplicate or non-scalar keys, non-core tags).
+    """
+    resolver = yaml.resolver.Resolver()
+    constructor = yaml.constructor.SafeConstructor()
+    write = dst.write
+    # one frame per open container: [is_mapping, child_count, expecting_key, seen_keys]
+    stack = []
+    documents = 0
+
+    def scalar_value(event):
+        tag = event.tag
+        if tag is None or tag == '!':
+            tag = resolver.resolve(yaml.ScalarNode, event.value, event.implicit)
+        if tag == _STR_TAG:
+            return event.value
+        if tag == _MERGE_TAG or tag not in constructor.yaml_constructors:
+            raise NeedsTree(f"scalar tag {tag}")
+        return constructor.yaml_constructors[tag](constructor, yaml.ScalarNode(tag, event.value, style=event.style))
+
+    def json_key(value):
+        # the spellings json/orjson give non-string keys
+        if isinstance(value, str):
+            return value
+        if value is True or value is False:
+            return 'true' if value else 'false'
+        if value is None:
+            return 'null'
+        if type(value) is int:
+            return str(value)
+        raise NeedsTree(f"mapping key of type {type(value).__name__}")
+
+    def begin_item(frame):
+        # separator + newline/indent before a child of the innermost container
+        write(b',\n' if frame[1] else b'\n')
+        write(b'  ' * len(stack))
+        frame[1] += 1
+
+    for event in yaml.parse(src, Loader=SafeLoader):
+        if isinstance(event, yaml.AliasEvent) or getattr(event, 'anchor', None):
+            raise NeedsTree("anchors/aliases")
+
+        frame = stack[-1] if stack else None
+        if frame is not None and frame[0] and frame[2] and not isinstance(event, yaml.MappingEndEvent):
+            if not isinstance(event, yaml.ScalarEvent):
+                raise NeedsTree("non-scalar mapping key")
+            value = scalar_value(event)
+            key = json_key(value)
+            # compare as Python keys, the way the dict would (1 == True, 1 != '1')
+            if value in frame[3]:
+                raise NeedsTree(f"duplicate key {key!r}")
+            frame[3].add(value)
+            begin_item(frame)
+            write(dumps(key))
+            write(b': ')
+            frame[2] = False
+            continue
+
+        if isinstance(event, (yaml.ScalarEvent, yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+            if frame is not None:
+                if frame[0]:
+                    # mapping value: the key already wrote the separator
+                    frame[2] = True
+                else:
+                    begin_item(frame)
+            if isinstance(event, yaml.ScalarEvent):
+                write(dumps(scalar_value(event)))
+            elif isinstance(event, yaml.MappingStartEvent):
+                if event.tag not in _MAP_TAGS:
+                    raise NeedsTree(f"mapping tag {event.tag}")
+                write(b'{')
+                stack.append([True, 0, True, set()])
+            else:
+                if event.tag not in _SEQ_TAGS:
+                    raise NeedsTree(f"sequence tag {event.tag}")
+                write(b'[')
+                stack.append([False, 0, False, None])
+        elif isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+            is_mapping, count = stack.pop()[:2]
+            if count:
+                write(b'\n')
+                write(b'  ' * len(stack))
+            write(b'}' if is_mapping else b']')
+        elif isinstance(event, yaml.DocumentStartEvent):
+            documents += 1
+            if documents > 1:
+                raise NeedsTree("multiple documents")
+
+    if not documents:
+        write(b'null')
+
+
+def up_to_date():
+    """True when openapi.json is newer than both openapi.yaml and this generator"""
+    try:
+        out_mtime = os.stat(json_path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+    return out_mtime >= max(os.stat(yaml_path).st_mtime_ns, os.stat(__file__).st_mtime_ns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Regenerate api/openapi.json from api/openapi.yaml')
+    parser.add_argument('--force', action='store_true', help='Regenerate even if openapi.json looks up to date')
+    args = parser.parse_args()
+
+    # make-style incremental rebuild; output is only ever replaced whole
+    # (see below), so its mtime is a reliable "last complete run" marker
+    if not args.force and up_to_date():
+        print(f"{os.path.relpath(json_path, ROOT)} is up to date.")
+        return
+
+    # Emit straight from the YAML event stream; if the spec needs the full
+    # tree, rewind and fall back to load + dump. Output goes to a temp file
+    # (binary, large buffer: no text-codec layer) that replaces openapi.json
+    # only once complete, so a YAML error never leaves a truncated file.
+    fd, tmp_path = tempfile.mkstemp(prefix='.openapi-', suffix='.json.tmp', dir=os.path.dirname(json_path))
+    try:
+        with open(yaml_path, 'rb') as src, open(fd, 'wb', buffering=1 << 20) as f:
+            try:
+                stream_yaml_to_json(src, f)
+            except NeedsTree:
+                f.seek(0)
+                f.truncate()
+                f.write(dumps(load_spec(yaml_path), indent=True))
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, json_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
 
-with open(json_path, 'w', encoding='utf-8') as f:
-    json.dump(data, f, indent=2, ensure_ascii=False, default=str)
+    print(f"Generated {os.path.relpath(json_path, ROOT)} from YAML.")
 
-print(f"Generated {os.path.relpath(json_path, ROOT)} from YAML.")
+if __name__ == '__main__':
+    main()
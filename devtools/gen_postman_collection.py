@@ -3,18 +3,106 @@
 Generate Postman collection from OpenAPI specification
 """
 
-import yaml
 import json
+import os
+import re
 import sys
+import tempfile
+from collections import defaultdict
 from pathlib import Path
 
+from _spec_cache import load_spec
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Postman URL pieces shared by every request; the variables are declared in
+# the collection's "variable" block
+URL_PREFIX = "{{scheme}}://{{host}}:{{port}}"
+URL_HOST = [URL_PREFIX]
+
+# path-item keys that are operations (others are parameters, summary, x-...)
+HTTP_METHODS = ('get', 'post', 'put', 'delete', 'patch', 'head', 'options')
+
+# OpenAPI path template parameter, e.g. {id}
+PATH_PARAM_RE = re.compile(r'\{([^}]+)\}')
+
+# auth headers, shared by every request that needs them; the collection is
+# only serialized, never mutated
+API_KEY_HEADER = {
+    "key": "X-API-Key",
+    "value": "{{apiKey}}",
+    "type": "text"
+}
+BEARER_HEADER = {
+    "key": "Authorization",
+    "value": "Bearer {{bearerToken}}",
+    "type": "text"
+}
+_HEADERS_CACHE = {}
+
+# collection-level variables referenced by every request URL and auth header
+COLLECTION_VARIABLES = [
+    {
+        "key": "scheme",
+        "value": "http",
+        "type": "string"
+    },
+    {
+        "key": "host",
+        "value": "localhost",
+        "type": "string"
+    },
+    {
+        "key": "port",
+        "value": "8010",
+        "type": "string"
+    },
+    {
+        "key": "apiKey",
+        "value": "",
+        "type": "string"
+    },
+    {
+        "key": "bearerToken",
+        "value": "",
+        "type": "string"
+    }
+]
+
+# placeholder payload for operations that take a JSON request body
+EXAMPLE_BODY_RAW = json.dumps({
+    "example": "Replace with actual request data"
+}, indent=2)
+
+# options block of every raw JSON request body
+BODY_OPTIONS = {
+    "raw": {
+        "language": "json"
+    }
+}
+
+def dump_json(obj):
+    """Serialize obj as indented UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+def load_json_bytes(data):
+    """Parse JSON from UTF-8 bytes"""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
 def load_openapi_spec(spec_path):
     """Load OpenAPI spec from YAML or JSON file"""
-    with open(spec_path, 'r') as f:
-        if spec_path.suffix.lower() == '.yaml' or spec_path.suffix.lower() == '.yml':
-            return yaml.safe_load(f)
-        else:
-            return json.load(f)
+    suffix = spec_path.suffix.lower()
+    if suffix in ('.yaml', '.yml'):
+        # libyaml-backed parse, reused from the on-disk cache when unchanged
+        return load_spec(spec_path)
+    # one binary read, parsed from bytes without a text-decode pass
+    with spec_path.open('rb') as f:
+        return load_json_bytes(f.read())
 
 def get_request_body_schema(schema_ref, components):
     """Get schema for request body"""
@@ -24,27 +112,37 @@ def get_request_body_schema(schema_ref, components):
     ref_path = schema_ref['$ref'].split('/')[-1]
     return components.get('schemas', {}).get(ref_path)
 
+def security_headers(security):
+    """Postman auth headers for an operation's security requirements.
+
+    Operations with the same requirements share one (read-only) list.
+    """
+    if not security:
+        return []
+    key = tuple(('ApiKeyAuth' in req, 'BearerAuth' in req) for req in security)
+    headers = _HEADERS_CACHE.get(key)
+    if headers is None:
+        headers = []
+        for api_key, bearer in key:
+            if api_key:
+                headers.append(API_KEY_HEADER)
+            if bearer:
+                headers.append(BEARER_HEADER)
+        _HEADERS_CACHE[key] = headers
+    return headers
+
 def create_postman_request(path, method, operation, components, base_url_vars):
     """Create a Postman request from OpenAPI operation"""
 
     # Build URL
-    url_parts = []
     query_params = []
 
-    # Handle path parameters
-    path_parts = path.split('/')
-    for part in path_parts:
-        if part.startswith('{') and part.endswith('}'):
-            param_name = part[1:-1]
-            url_parts.append(f"{{{{{param_name}}}}}")
-        else:
-            url_parts.append(part)
+    # Handle path parameters: /kpi/{id} -> /kpi/{{id}}
+    templated_path = PATH_PARAM_RE.sub(r'{{\1}}', path)
+    url_parts = [p for p in templated_path.split('/') if p]
 
     # Build raw URL
-    scheme = "{{scheme}}"
-    host = "{{host}}"
-    port = "{{port}}"
-    raw_url = f"{scheme}://{host}:{port}{'/'.join(url_parts)}"
+    raw_url = URL_PREFIX + templated_path
 
     # Handle query parameters
     if 'parameters' in operation:
@@ -56,24 +154,8 @@ def create_postman_request(path, method, operation, components, base_url_vars):
                     "description": param.get('description', '')
                 })
 
-    # Build headers
-    headers = []
-
-    # Add auth headers if security is required
-    if 'security' in operation:
-        for security_req in operation['security']:
-            if 'ApiKeyAuth' in security_req:
-                headers.append({
-                    "key": "X-API-Key",
-                    "value": "{{apiKey}}",
-                    "type": "text"
-                })
-            if 'BearerAuth' in security_req:
-                headers.append({
-                    "key": "Authorization",
-                    "value": "Bearer {{bearerToken}}",
-                    "type": "text"
-                })
+    # Build headers: add auth headers if security is required
+    headers = security_headers(operation.get('security'))
 
     # Handle request body
     body = None
@@ -84,14 +166,8 @@ def create_postman_request(path, method, operation, components, base_url_vars):
             if schema:
                 body = {
                     "mode": "raw",
-                    "raw": json.dumps({
-                        "example": "Replace with actual request data"
-                    }, indent=2),
-                    "options": {
-                        "raw": {
-                            "language": "json"
-                        }
-                    }
+                    "raw": EXAMPLE_BODY_RAW,
+                    "options": BODY_OPTIONS
                 }
 
     # Create the request
@@ -100,8 +176,8 @@ def create_postman_request(path, method, operation, components, base_url_vars):
         "header": headers,
         "url": {
             "raw": raw_url,
-            "host": [f"{scheme}://{host}:{port}"],
-            "path": [p for p in url_parts if p],
+            "host": URL_HOST,
+            "path": url_parts,
             "query": query_params
         }
     }
@@ -115,76 +191,103 @@ def create_postman_request(path, method, operation, components, base_url_vars):
         "response": []
     }
 
-def create_postman_collection(openapi_spec):
-    """Create Postman collection from OpenAPI spec"""
+def iter_postman_folders(openapi_spec):
+    """Yield one Postman folder per tag, building its requests only when it is reached"""
 
-    # Group operations by tags
-    tag_groups = {}
+    # Group operations by tags; keep only the (path, method) keys and resolve the
+    # operation again at emit time so the grouping holds no extra references
+    tag_groups = defaultdict(list)
     paths = openapi_spec.get('paths', {})
+    components = openapi_spec.get('components', {})
 
     for path, methods in paths.items():
         for method, operation in methods.items():
-            if method.lower() not in ['get', 'post', 'put', 'delete', 'patch', 'head', 'options']:
+            if method.lower() not in HTTP_METHODS:
                 continue
 
-            tags = operation.get('tags', ['untagged'])
-            for tag in tags:
-                if tag not in tag_groups:
-                    tag_groups[tag] = []
-                tag_groups[tag].append((path, method, operation))
+            for tag in operation.get('tags', ['untagged']):
+                tag_groups[tag].append((path, method))
 
-    # Create collection items
-    items = []
     for tag, operations in tag_groups.items():
-        folder_items = []
-        for path, method, operation in operations:
-            request = create_postman_request(path, method, operation, openapi_spec.get('components', {}), {})
-            folder_items.append(request)
-
-        items.append({
+        yield {
             "name": tag.title().replace('-', ' '),
-            "item": folder_items
-        })
+            "item": [
+                create_postman_request(path, method, paths[path][method], components, {})
+                for path, method in operations
+            ]
+        }
+
+def collection_info(openapi_spec):
+    """Postman "info" block for the spec"""
+    return {
+        "name": openapi_spec['info']['title'],
+        "description": openapi_spec['info']['description'],
+        "schema": "https://schema.getpostman.com/json/collection/v2.1.0/collection.json"
+    }
+
+def create_postman_collection(openapi_spec):
+    """Create Postman collection from OpenAPI spec"""
+
+    # Create collection items
+    items = list(iter_postman_folders(openapi_spec))
 
     # Create collection
     collection = {
-        "info": {
-            "name": openapi_spec['info']['title'],
-            "description": openapi_spec['info']['description'],
-            "schema": "https://schema.getpostman.com/json/collection/v2.1.0/collection.json"
-        },
+        "info": collection_info(openapi_spec),
         "item": items,
-        "variable": [
-            {
-                "key": "scheme",
-                "value": "http",
-                "type": "string"
-            },
-            {
-                "key": "host",
-                "value": "localhost",
-                "type": "string"
-            },
-            {
-                "key": "port",
-                "value": "8010",
-                "type": "string"
-            },
-            {
-                "key": "apiKey",
-                "value": "",
-                "type": "string"
-            },
-            {
-                "key": "bearerToken",
-                "value": "",
-                "type": "string"
-            }
-        ]
+        "variable": COLLECTION_VARIABLES
     }
 
     return collection
 
+def _indented(obj, depth):
+    # dump_json(obj) as it appears nested depth levels deep in an indent=2 document;
+    # JSON strings never contain raw newlines, so re-indenting line starts is safe
+    return dump_json(obj).replace(b"\n", b"\n" + b"  " * depth)
+
+class JsonArrayWriter:
+    """Write a JSON array to f one element at a time, laid out like dump_json.
+
+    depth is the nesting level of the array itself within the document.
+    """
+
+    def __init__(self, f, depth=0):
+        self.f = f
+        self.depth = depth
+        self.count = 0
+
+    def __enter__(self):
+        self.f.write(b"[")
+        return self
+
+    def append(self, obj):
+        self.f.write(b",\n" if self.count else b"\n")
+        self.f.write(b"  " * (self.depth + 1))
+        self.f.write(_indented(obj, self.depth + 1))
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.count:
+            self.f.write(b"\n" + b"  " * self.depth)
+        self.f.write(b"]")
+        return False
+
+def write_postman_collection(openapi_spec, f):
+    """Stream the collection for openapi_spec to the binary file f.
+
+    Produces the same bytes as dump_json(create_postman_collection(openapi_spec))
+    while holding only one folder in memory at a time.
+    """
+    f.write(b'{\n  "info": ')
+    f.write(_indented(collection_info(openapi_spec), 1))
+    f.write(b',\n  "item": ')
+    with JsonArrayWriter(f, depth=1) as items:
+        for folder in iter_postman_folders(openapi_spec):
+            items.append(folder)
+    f.write(b',\n  "variable": ')
+    f.write(_indented(COLLECTION_VARIABLES, 1))
+    f.write(b"\n}")
+
 def main():
     if len(sys.argv) != 2:
         print("Usage: python gen_postman_collection.py <openapi_spec_file>")
@@ -198,13 +301,18 @@ def main():
     # Load OpenAPI spec
     openapi_spec = load_openapi_spec(spec_path)
 
-    # Generate Postman collection
-    collection = create_postman_collection(openapi_spec)
-
-    # Write to file
+    # Generate the Postman collection straight to disk, folder by folder; the
+    # temp file only replaces the output once it is complete
     output_path = spec_path.parent / "mirador-core.postman_collection.json"
-    with open(output_path, 'w') as f:
-        json.dump(collection, f, indent=2)
+    fd, tmp_path = tempfile.mkstemp(prefix='.postman-', suffix='.json.tmp', dir=spec_path.parent)
+    try:
+        with open(fd, 'wb', buffering=1 << 20) as f:
+            write_postman_collection(openapi_spec, f)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
 
     print(f"Generated Postman collection: {output_path}")
 
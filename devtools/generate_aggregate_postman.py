@@ -1,34 +1,55 @@
 #!/usr/bin/env python3
 import json
 
-def generate_aggregate_postman_items():
-    # List of aggregate functions from the OpenAPI
-    functions = [
-        "sum", "avg", "count", "min", "max", "median", "quantile", "topk", "bottomk", "distinct",
-        "histogram", "outliers_iqr", "outliersk", "stddev", "stdvar", "mad", "zscore", "mode",
-        "skewness", "kurtosis", "cov", "range", "delta", "idelta", "increase", "irate", "rate",
-        "geomean", "harmean", "trimean", "iqr", "percentile", "entropy", "mode_multi", "count_values", "corr"
-    ]
-
-    postman_items = []
-    for func in functions:
-        item = {
-            "name": f"POST /metrics/query/aggregate/{func}",
-            "request": {
-                "method": "POST",
-                "header": [{"key": "Content-Type", "value": "application/json"}],
-                "url": {"raw": f"{{{{baseUrl}}}}/metrics/query/aggregate/{func}"},
-                "body": {
-                    "mode": "raw",
-                    "raw": '{\n  "query": "cpu_usage{instance=\\"server1\\"}"\n}'
-                },
-                "description": f"MetricsQL {func} aggregate function"
-            }
+# List of aggregate functions from the OpenAPI
+FUNCTIONS = [
+    "sum", "avg", "count", "min", "max", "median", "quantile", "topk", "bottomk", "distinct",
+    "histogram", "outliers_iqr", "outliersk", "stddev", "stdvar", "mad", "zscore", "mode",
+    "skewness", "kurtosis", "cov", "range", "delta", "idelta", "increase", "irate", "rate",
+    "geomean", "harmean", "trimean", "iqr", "percentile", "entropy", "mode_multi", "count_values", "corr"
+]
+
+QUERY_BODY_RAW = '{\n  "query": "cpu_usage{instance=\\"server1\\"}"\n}'
+
+def _item_fields(functions):
+    # the per-function fields, one list each
+    names = [f"POST /metrics/query/aggregate/{func}" for func in functions]
+    urls = [f"{{{{baseUrl}}}}/metrics/query/aggregate/{func}" for func in functions]
+    descs = [f"MetricsQL {func} aggregate function" for func in functions]
+    return names, urls, descs
+
+def _postman_item(name, url, description):
+    return {
+        "name": name,
+        "request": {
+            "method": "POST",
+            "header": [{"key": "Content-Type", "value": "application/json"}],
+            "url": {"raw": url},
+            "body": {
+                "mode": "raw",
+                "raw": QUERY_BODY_RAW
+            },
+            "description": description
         }
-        postman_items.append(item)
+    }
+
+def _item_template():
+    # Serialize one item with a placeholder name, exactly as it appears inside
+    # the indent=2 top-level list, and turn it into a str.format template.
+    # Function names are plain identifiers, so they need no JSON escaping.
+    marker = "@@func@@"
+    item = _postman_item(*(field[0] for field in _item_fields([marker])))
+    text = "\n".join("  " + line for line in json.dumps(item, indent=2).splitlines())
+    return text.replace("{", "{{").replace("}", "}}").replace(marker, "{func}")
+
+ITEM_TEMPLATE = _item_template()
+
+def generate_aggregate_postman_items():
+    return [_postman_item(*fields) for fields in zip(*_item_fields(FUNCTIONS))]
 
-    return postman_items
+def render_aggregate_postman_items():
+    """Return the JSON text of generate_aggregate_postman_items() without building the dicts"""
+    return "[\n" + ",\n".join(ITEM_TEMPLATE.format(func=func) for func in FUNCTIONS) + "\n]"
 
 if __name__ == "__main__":
-    items = generate_aggregate_postman_items()
-    print(json.dumps(items, indent=2))
\ No newline at end of file
+    print(render_aggregate_postman_items())
@@ -5,77 +5,132 @@ Usage: BASE_URL=http://localhost:8010 python3 scripts/localdev_seed_kpis.py
 """
 import os
 import sys
+import re
 import json
-import glob
 import argparse
-from urllib import request, parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import chain
+from urllib import error, request, parse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import urllib3
+except ImportError:
+    urllib3 = None
 
 BASE_DIR = os.path.join(os.path.dirname(__file__), "..")
 KPI_DIR = os.path.normpath(os.path.join(BASE_DIR, "deployments/localdev/kpi-seeding-definitions"))
 SIG_DIR = os.path.normpath(os.path.join(BASE_DIR, "deployments/localdev/signal-defnitions"))
 
+# items per bulk-json POST; small files are merged into shared batches
+BATCH_SIZE = 500
+
+# concurrent bulk POSTs in flight while seeding
+MAX_WORKERS = 8
+
+# one keep-alive pool shared by every POST instead of a new connection per file;
+# sized to MAX_WORKERS so concurrent requests never discard pooled sockets
+_http = None
+if urllib3 is not None:
+    _http = urllib3.PoolManager(num_pools=1, maxsize=MAX_WORKERS, retries=urllib3.Retry(3, backoff_factor=0.2))
+
+
+def _loads(data):
+    # orjson parses bytes directly; stdlib json also accepts UTF-8 bytes
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _dumps(obj):
+    # returns UTF-8 encoded bytes ready to be used as a request body
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
+
+# simple key mappings for the legacy snake_case KPI/signal exports
+_KEY_MAPPING = {
+    'kpi_name': 'name',
+    'kpi_formula': 'formula',
+    'kpi_definition': 'definition',
+    'signal_type': 'signalType',
+    'query_type': 'queryType',
+    'datastore': 'datastore',
+    'layer': 'layer',
+    'classifier': 'classifier',
+    'sentiment': 'sentiment',
+    'kind': 'kind',
+    'tags': 'tags',
+    'namespace': 'namespace',
+    'source': 'source',
+    'sourceId': 'sourceId',
+    'source_id': 'sourceId',
+}
+
+# raw key -> normalized key, filled on first sight; files repeat the same
+# handful of keys, so after warm-up every key costs a single dict lookup
+_KEY_CACHE = {}
+
+# keys seen so far that normalize to themselves (already camelCase, or
+# identity entries such as 'layer'); an item made only of these needs no rewrite
+_PASSTHROUGH_KEYS = set()
+
+_TAG_SEP = re.compile(r'[;,]')
+
+
+def _normalize_key(k):
+    # exact match wins, then a case-insensitive match, else keep the key as-is
+    nk = _KEY_MAPPING.get(k) or _KEY_MAPPING.get(k.lower()) or k
+    _KEY_CACHE[k] = nk
+    if nk == k:
+        _PASSTHROUGH_KEYS.add(k)
+    return nk
+
+
+def list_json_files(directory):
+    """Return the sorted paths of the *.json files directly inside directory"""
+    # scandir exposes d_type via DirEntry, so there is no extra stat() per entry
+    try:
+        with os.scandir(directory) as it:
+            return sorted(e.path for e in it
+                          if e.name.endswith('.json') and not e.name.startswith('.') and e.is_file())
+    except FileNotFoundError:
+        return []
+
 
 def normalize_item(raw):
     # raw may use different keys like kpi_name, kpi_formula, signal_type, etc.
-    out = {}
-    # simple key mappings
-    mapping = {
-        'kpi_name': 'name',
-        'kpi_formula': 'formula',
-        'kpi_definition': 'definition',
-        'signal_type': 'signalType',
-        'query_type': 'queryType',
-        'datastore': 'datastore',
-        'layer': 'layer',
-        'classifier': 'classifier',
-        'sentiment': 'sentiment',
-        'kind': 'kind',
-        'tags': 'tags',
-        'namespace': 'namespace',
-        'source': 'source',
-        'sourceId': 'sourceId',
-        'source_id': 'sourceId',
-    }
-    for k, v in raw.items():
-        lk = k.lower()
-        if k in mapping:
-            out[mapping[k]] = v
-        elif lk in mapping:
-            out[mapping[lk]] = v
-        else:
-            # try snake to camel for common names
-            if lk == 'kpi_name':
-                out['name'] = v
-            else:
-                out[k] = v
+    if raw.keys() <= _PASSTHROUGH_KEYS:
+        # already normalized: a C-level subset check and copy instead of the per-key rewrite
+        out = dict(raw)
+    else:
+        out = {(_KEY_CACHE.get(k) or _normalize_key(k)): v for k, v in raw.items()}
     # defaults
-    if 'kind' not in out or not out.get('kind'):
+    if not out.get('kind'):
         out['kind'] = 'tech'
     # ensure tags is list
-    if 'tags' in out and isinstance(out['tags'], str):
-        parts = [p.strip() for p in out['tags'].replace(';',',').split(',') if p.strip()]
-        out['tags'] = parts
+    tags = out.get('tags')
+    if isinstance(tags, str):
+        out['tags'] = [p.strip() for p in _TAG_SEP.split(tags) if p.strip()]
     return out
 
 
 def extract_items_from_file(path):
-    with open(path, 'r') as fh:
-        data = json.load(fh)
-    items = []
-    if isinstance(data, list):
+    with open(path, 'rb') as fh:
+        data = _loads(fh.read())
+    # decoded JSON only ever yields exact list/dict, so identity type checks suffice
+    if type(data) is list:
         items = data
-    elif isinstance(data, dict):
-        # find first list value or merge all lists
-        for v in data.values():
-            if isinstance(v, list):
-                items.extend(v)
-        # if still empty, maybe the dict itself is a single item
-        if not items:
-            items = [data]
+    elif type(data) is dict:
+        # merge all list values; if there are none, the dict itself is a single item
+        items = list(chain.from_iterable(v for v in data.values() if type(v) is list)) or [data]
     else:
         items = [data]
     # normalize each
-    out = [normalize_item(it) for it in items]
+    out = list(map(normalize_item, items))
     return out
 
 
@@ -87,17 +142,106 @@ def post_payload(base_url, payload, resource='kpi'):
     else:
         path = '/api/v1/kpi/defs/bulk-json'
     url = base_url.rstrip('/') + path
-    body = json.dumps({'items': payload}).encode('utf-8')
-    req = request.Request(url, data=body, headers={'Content-Type': 'application/json'}, method='POST')
+    body = _dumps({'items': payload})
+    headers = {'Content-Type': 'application/json'}
     try:
-        with request.urlopen(req, timeout=30) as resp:
-            resp_body = resp.read().decode('utf-8')
+        if _http is not None:
+            resp = _http.request('POST', url, body=body, headers=headers, timeout=30.0)
+            code, resp_body = resp.status, resp.data
+        else:
+            req = request.Request(url, data=body, headers=headers, method='POST')
             try:
-                return resp.getcode(), json.loads(resp_body)
-            except Exception:
-                return resp.getcode(), resp_body
+                with request.urlopen(req, timeout=30) as resp:
+                    code, resp_body = resp.getcode(), resp.read()
+            except error.HTTPError as e:
+                # urlopen raises on 4xx/5xx; report it as an HTTP status like urllib3 does
+                code, resp_body = e.code, e.read()
     except Exception as e:
         return None, str(e)
+    try:
+        return code, _loads(resp_body)
+    except Exception:
+        return code, resp_body.decode('utf-8', errors='replace')
+
+
+def report_result(code, resp, nitems):
+    """Print the outcome of one bulk POST and return (succeeded, failed) item counts"""
+    if code is None:
+        print('  POST failed:', resp)
+        return 0, nitems
+    # Treat any 2xx as success; prefer BulkSummary when present
+    if 200 <= code < 300:
+        if code == 204:
+            # No content — assume all items were accepted (no-change or similar)
+            print('  result: HTTP', code, '- no content (treated as success for', nitems, 'items)')
+            return nitems, 0
+        if isinstance(resp, dict):
+            sc = resp.get('successCount') or resp.get('success_count') or 0
+            fc = resp.get('failureCount') or resp.get('failure_count') or 0
+            print('  result: HTTP', code, '- success:', sc, ' failure:', fc)
+            return sc, fc
+        # unknown response body but 2xx status: treat as all succeeded
+        print('  result: HTTP', code, '- response:', resp)
+        return nitems, 0
+    print('  result: HTTP', code, '- response:', resp)
+    return 0, nitems
+
+
+def chunks(items, size):
+    """Yield consecutive slices of at most size items"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def report_failures(resp, start, nitems, sources):
+    """Name the source file (and item within it) of each failure in a bulk batch"""
+    failures = resp.get('failures') if isinstance(resp, dict) else None
+    if not failures:
+        # the whole batch was rejected (or no per-item detail): every file in it is affected
+        batch_sources = sorted({path for path, _ in sources[start:start + nitems]})
+        print('  files in batch:', ', '.join(os.path.basename(p) for p in batch_sources))
+        return
+    for failure in failures:
+        # BulkSummary omits index 0 (omitempty), so a missing index means the first item
+        idx = failure.get('index') or 0
+        if not 0 <= idx < nitems:
+            print('  failed item (unknown index', idx, '):', failure.get('message'))
+            continue
+        path, item_no = sources[start + idx]
+        print('  failed:', os.path.basename(path), 'item', item_no, '-', failure.get('message'))
+
+
+def seed_files(base_url, files, resource='kpi', batch_size=BATCH_SIZE, max_workers=MAX_WORKERS):
+    """POST the items of all files in bulk batches and return (total, succeeded, failed) item counts"""
+    all_items = []
+    # (source file, position in that file) of each item, kept aside (not sent)
+    # so failures reported by batch index can be traced back to their file
+    sources = []
+    for f in files:
+        print('Seeding', f)
+        items = extract_items_from_file(f)
+        all_items.extend(items)
+        sources.extend((f, i) for i in range(len(items)))
+
+    total = len(all_items)
+    succeeded = failed = 0
+    # the work is network-bound, so threads overlap the per-POST round trips;
+    # results are reported from this thread only, so output lines never interleave
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+        for n, batch in enumerate(chunks(all_items, batch_size)):
+            futures[pool.submit(post_payload, base_url, batch, resource)] = (n * batch_size, len(batch))
+        for fut in as_completed(futures):
+            start, nitems = futures[fut]
+            nfiles = len({path for path, _ in sources[start:start + nitems]})
+            print('Batch items', start + 1, '-', start + nitems, 'from', nfiles, 'file(s)')
+            code, resp = fut.result()
+            sc, fc = report_result(code, resp, nitems)
+            if fc:
+                report_failures(resp, start, nitems, sources)
+            succeeded += sc
+            failed += fc
+    return total, succeeded, failed
 
 
 def main():
@@ -106,83 +250,26 @@ def main():
     parser.add_argument('--dir', default=KPI_DIR, help='Directory containing KPI JSON files')
     parser.add_argument('--sig-dir', default=SIG_DIR, help='Directory containing signal JSON files')
     parser.add_argument('--seed-signals', action='store_true', help='Also seed signal definitions from --sig-dir')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Maximum items per bulk POST')
     args = parser.parse_args()
+    if args.batch_size <= 0:
+        parser.error('--batch-size must be a positive integer')
 
-    files = sorted(glob.glob(os.path.join(args.dir, '*.json')))
+    files = list_json_files(args.dir)
     if not files:
         print('No KPI JSON files found in', args.dir, file=sys.stderr)
         sys.exit(1)
 
-    total = 0
-    total_success = 0
-    total_fail = 0
-
-    for f in files:
-        print('Seeding', f)
-        items = extract_items_from_file(f)
-        total += len(items)
-        code, resp = post_payload(args.base_url, items, resource='kpi')
-        if code is None:
-            print('  POST failed:', resp)
-            total_fail += len(items)
-            continue
-        # Treat any 2xx as success; prefer BulkSummary when present
-        if 200 <= code < 300:
-            if code == 204:
-                # No content — assume all items were accepted (no-change or similar)
-                print('  result: HTTP', code, '- no content (treated as success for', len(items), 'items)')
-                total_success += len(items)
-                continue
-            if isinstance(resp, dict):
-                sc = resp.get('successCount') or resp.get('success_count') or 0
-                fc = resp.get('failureCount') or resp.get('failure_count') or 0
-                print('  result: HTTP', code, '- success:', sc, ' failure:', fc)
-                total_success += sc
-                total_fail += fc
-            else:
-                # unknown response body but 2xx status: treat as all succeeded
-                print('  result: HTTP', code, '- response:', resp)
-                total_success += len(items)
-        else:
-            print('  result: HTTP', code, '- response:', resp)
-            total_fail += len(items)
+    total, total_success, total_fail = seed_files(args.base_url, files, resource='kpi', batch_size=args.batch_size)
 
     # optionally seed signals
     if args.seed_signals:
-        s_files = sorted(glob.glob(os.path.join(args.sig_dir, '*.json')))
+        s_files = list_json_files(args.sig_dir)
         if not s_files:
             print('No signal JSON files found in', args.sig_dir, file=sys.stderr)
         else:
             print('\nSeeding signal definitions from', args.sig_dir)
-            s_total = 0
-            s_succ = 0
-            s_fail = 0
-            for f in s_files:
-                print('Seeding', f)
-                items = extract_items_from_file(f)
-                s_total += len(items)
-                code, resp = post_payload(args.base_url, items, resource='signal')
-                if code is None:
-                    print('  POST failed:', resp)
-                    s_fail += len(items)
-                    continue
-                if 200 <= code < 300:
-                    if code == 204:
-                        print('  result: HTTP', code, '- no content (treated as success for', len(items), 'items)')
-                        s_succ += len(items)
-                        continue
-                    if isinstance(resp, dict):
-                        sc = resp.get('successCount') or resp.get('success_count') or 0
-                        fc = resp.get('failureCount') or resp.get('failure_count') or 0
-                        print('  result: HTTP', code, '- success:', sc, ' failure:', fc)
-                        s_succ += sc
-                        s_fail += fc
-                    else:
-                        print('  result: HTTP', code, '- response:', resp)
-                        s_succ += len(items)
-                else:
-                    print('  result: HTTP', code, '- response:', resp)
-                    s_fail += len(items)
+            s_total, s_succ, s_fail = seed_files(args.base_url, s_files, resource='signal', batch_size=args.batch_size)
             print('Signal Summary: total items:', s_total, 'succeeded:', s_succ, 'failed:', s_fail)
 
     print('KPI Summary: total items:', total, 'succeeded:', total_success, 'failed:', total_fail)
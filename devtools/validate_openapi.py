@@ -5,11 +5,58 @@ try:
 except Exception as e:
     print('PyYAML not installed. Install via pip install pyyaml', file=sys.stderr)
     sys.exit(1)
-from pathlib import Path
-y = Path('api/openapi.yaml').read_text(encoding='utf-8')
-data = yaml.safe_load(y)
+try:
+    import fastjsonschema
+except ImportError:
+    print('fastjsonschema not installed. Install via pip install -r devtools/requirements.txt', file=sys.stderr)
+    sys.exit(1)
+from _spec_cache import load_spec
+
+# Structural subset of the OpenAPI 3.0 meta-schema: required top-level
+# sections, info fields, path keys and operations carrying responses.
+_OPERATION = {'type': 'object', 'required': ['responses'], 'properties': {
+    'tags': {'type': 'array', 'items': {'type': 'string'}},
+    'parameters': {'type': 'array', 'items': {'type': 'object'}},
+    'requestBody': {'type': 'object'},
+    'responses': {'type': 'object', 'minProperties': 1},
+}}
+OPENAPI_STRUCTURE_SCHEMA = {
+    '$schema': 'http://json-schema.org/draft-07/schema#',
+    'type': 'object',
+    'required': ['openapi', 'info', 'paths'],
+    'properties': {
+        'openapi': {'type': 'string', 'pattern': r'^3\.\d+\.\d+$'},
+        'info': {'type': 'object', 'required': ['title', 'version'], 'properties': {
+            'title': {'type': 'string'},
+            'version': {'type': 'string'},
+        }},
+        'servers': {'type': 'array', 'items': {'type': 'object', 'required': ['url']}},
+        'tags': {'type': 'array', 'items': {'type': 'object', 'required': ['name']}},
+        'paths': {
+            'type': 'object',
+            'patternProperties': {
+                '^/': {'type': 'object', 'properties': {
+                    m: _OPERATION for m in ('get', 'put', 'post', 'delete', 'options', 'head', 'patch', 'trace')
+                }},
+                '^x-': {},
+            },
+            'additionalProperties': False,
+        },
+        'components': {'type': 'object', 'properties': {'schemas': {'type': 'object'}}},
+    },
+}
+
+data = load_spec('api/openapi.yaml')
 assert isinstance(data, dict) and 'openapi' in data, 'Invalid OpenAPI YAML: missing openapi key'
 print('YAML parse OK; version:', data.get('openapi'))
 print('Paths count:', len((data.get('paths') or {})))
 print('Components:', 'schemas' in (data.get('components') or {}))
+# compiled to a specialised Python function instead of interpreting the schema per node
+validate = fastjsonschema.compile(OPENAPI_STRUCTURE_SCHEMA)
+try:
+    validate(data)
+except fastjsonschema.JsonSchemaException as e:
+    print('Schema validation failed:', e.message, file=sys.stderr)
+    sys.exit(1)
+print('Schema validation OK')
 print('Validation (structural) OK')